@@ -5,12 +5,13 @@ This script provides a web interface for real-time translation between Indian la
 It handles user input, language selection, translation, and displays results with loading indicators.
 """
 
+import csv
 import os
 import sys
+import threading
 from pathlib import Path
 
 import pandas as pd
-import sacrebleu
 import streamlit as st
 
 # Ensure project root is on sys.path so `model` package is importable when running from repo root
@@ -18,7 +19,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from model.nmt_model import translate_text, SUPPORTED_LANGUAGES
+from model.nmt_model import translate_text, corpus_scores, SUPPORTED_LANGUAGES
 from model.google_compare import compare_to_google
 
 
@@ -35,27 +36,37 @@ try:
 except PermissionError:
     st.error(f"Cannot create OUT_DIR at {OUT_DIR}. Please check permissions.")
 HIST_CSV = DATA_DIR / "historical.csv"
+HIST_COLUMNS = ["source_lang", "target_lang", "src_text", "ref_text", "our_translation"]
 EVAL_CSV = OUT_DIR / "eval_results.csv"
 
 
+EVAL_TEXT_COLUMNS = ["source_lang", "target_lang", "src_text", "ref_text", "our_translation", "google_translation"]
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _read_eval_csv(path: str, mtime_ns: int) -> pd.DataFrame:
+    """Load the evaluation CSV with explicit text dtypes; mtime_ns is part of the cache key so a rewritten file is re-read."""
+    dtype = {c: str for c in EVAL_TEXT_COLUMNS}
+    try:
+        # Multi-threaded Arrow CSV parser
+        return pd.read_csv(path, engine="pyarrow", dtype=dtype)
+    except (ImportError, ValueError):
+        return pd.read_csv(path, dtype=dtype)
+
+
 def _show_corpus_summary(df_eval: pd.DataFrame):
     # Filter rows with references
     df_ref = df_eval[df_eval['ref_text'].fillna('').astype(str).str.strip() != ''].copy()
     if df_ref.empty:
         st.info("No references found in history; corpus metrics unavailable.")
         return
-    refs = [[r] for r in df_ref['ref_text'].astype(str).tolist()]
-
-    # Our metrics
+    # Extract each column once; references are tokenized once and reused for both systems
+    refs = df_ref['ref_text'].astype(str).tolist()
     our_hyps = df_ref['our_translation'].astype(str).tolist()
-    our_bleu = sacrebleu.corpus_bleu(our_hyps, refs).score
-    ter_metric = sacrebleu.metrics.TER()
-    our_ter = ter_metric.corpus_score(our_hyps, refs).score
-
-    # Google metrics
     google_hyps = df_ref['google_translation'].fillna('').astype(str).tolist()
-    google_bleu = sacrebleu.corpus_bleu(google_hyps, refs).score
-    google_ter = ter_metric.corpus_score(google_hyps, refs).score
+    ours, google = corpus_scores([our_hyps, google_hyps], refs)
+    our_bleu, our_ter = ours["bleu"], ours["ter"]
+    google_bleu, google_ter = google["bleu"], google["ter"]
 
     c1, c2 = st.columns(2)
     with c1:
@@ -68,13 +79,60 @@ def _show_corpus_summary(df_eval: pd.DataFrame):
         st.metric("TER", f"{google_ter:.2f}")
 
 
-def _run_evaluation_and_display():
+@st.cache_resource
+def _evaluation_lock() -> threading.Lock:
+    """One lock per server process, shared by every session and rerun, so only one evaluation writes EVAL_CSV at a time."""
+    return threading.Lock()
+
+
+# Progress-bar label and offset for each evaluator stage; each stage fills half of the bar
+_EVAL_STAGES = {"translate": ("Translated", 0.0), "google": ("Fetched Google translations for", 0.5)}
+
+
+def _run_evaluation_and_display() -> bool:
+    """Run the evaluator and show its results; returns False if another evaluation is still running."""
     from scripts.evaluate import main as eval_main
-    eval_main(str(HIST_CSV), str(EVAL_CSV))
-    df_eval = pd.read_csv(EVAL_CSV)
+
+    # The worker outlives a Streamlit stop/rerun, so it holds the lock until it has finished writing EVAL_CSV
+    lock = _evaluation_lock()
+    if not lock.acquire(blocking=False):
+        st.warning("An evaluation is already running. Try again when it finishes.")
+        return False
+
+    # Run the evaluator on a worker thread and poll its progress, so the page keeps updating
+    progress = {"stage": "translate", "done": 0, "total": 0}
+    errors = []
+
+    def _worker():
+        try:
+            eval_main(str(HIST_CSV), str(EVAL_CSV),
+                      on_progress=lambda stage, done, total: progress.update(stage=stage, done=done, total=total))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            lock.release()
+
+    worker = threading.Thread(target=_worker, daemon=True)
+    try:
+        worker.start()
+    except RuntimeError:
+        lock.release()
+        raise
+    bar = st.progress(0.0, text="Translating history…")
+    while worker.is_alive():
+        worker.join(timeout=0.5)
+        if progress["total"]:
+            label, offset = _EVAL_STAGES[progress["stage"]]
+            bar.progress(offset + 0.5 * progress["done"] / progress["total"],
+                         text=f"{label} {progress['done']}/{progress['total']} rows")
+    bar.empty()
+    if errors:
+        raise errors[0]
+    df_eval = _read_eval_csv(str(EVAL_CSV), EVAL_CSV.stat().st_mtime_ns)
     _show_corpus_summary(df_eval)
     st.dataframe(df_eval.head(50))
     st.download_button("Download evaluation CSV", data=df_eval.to_csv(index=False), file_name="eval_results.csv", mime="text/csv")
+    return True
 
 
 st.set_page_config(page_title="Indian Language NMT Translator", layout="centered")
@@ -94,8 +152,8 @@ if st.sidebar.button("Evaluate now"):
     else:
         with st.spinner("Evaluating…"):
             try:
-                _run_evaluation_and_display()
-                st.success("Evaluation complete.")
+                if _run_evaluation_and_display():
+                    st.success("Evaluation complete.")
             except Exception as e:
                 st.error(f"Evaluation failed: {e}")
 
@@ -103,7 +161,7 @@ if st.sidebar.button("View last results"):
     if not EVAL_CSV.exists():
         st.sidebar.info("No evaluation results found.")
     else:
-        df_eval = pd.read_csv(EVAL_CSV)
+        df_eval = _read_eval_csv(str(EVAL_CSV), EVAL_CSV.stat().st_mtime_ns)
         _show_corpus_summary(df_eval)
         st.dataframe(df_eval.head(50))
         st.download_button("Download evaluation CSV", data=df_eval.to_csv(index=False), file_name="eval_results.csv", mime="text/csv")
@@ -143,23 +201,14 @@ if st.button("Translate"):
                     st.write("Google Translate:")
                     st.code(comp["google"])
 
-                # Append to history CSV
+                # Append to history CSV (one row per translation; header only when the file is new)
                 try:
-                    df_row = pd.DataFrame([
-                        {
-                            "source_lang": source_lang,
-                            "target_lang": target_lang,
-                            "src_text": input_text,
-                            "ref_text": ref_text or "",
-                            "our_translation": result['translation'],
-                        }
-                    ])
-                    if HIST_CSV.exists():
-                        df_hist = pd.read_csv(HIST_CSV)
-                        df_hist = pd.concat([df_hist, df_row], ignore_index=True)
-                        df_hist.to_csv(HIST_CSV, index=False)
-                    else:
-                        df_row.to_csv(HIST_CSV, index=False)
+                    write_header = not HIST_CSV.exists() or HIST_CSV.stat().st_size == 0
+                    with open(HIST_CSV, "a", newline="", encoding="utf-8") as f:
+                        writer = csv.writer(f)
+                        if write_header:
+                            writer.writerow(HIST_COLUMNS)
+                        writer.writerow([source_lang, target_lang, input_text, ref_text or "", result['translation']])
                     st.caption(f"Logged to {HIST_CSV}")
                 except Exception as log_e:
                     st.warning(f"Could not log history: {log_e}")
@@ -183,8 +232,8 @@ if st.button("Evaluate/Get Score"):
     else:
         with st.spinner("Running evaluation... this may take time on first run"):
             try:
-                _run_evaluation_and_display()
-                st.success("Evaluation complete.")
+                if _run_evaluation_and_display():
+                    st.success("Evaluation complete.")
             except Exception as e:
                 st.error(f"Evaluation failed: {e}")
 
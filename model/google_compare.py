@@ -1,10 +1,12 @@
 """
 google_compare.py: Compare our NMT outputs with Google Translate results.
 
-Uses googletrans (unofficial) by default. If you have an official Google Cloud
-Translate API key, you can extend this to use google-cloud-translate instead.
+Uses googletrans (unofficial) by default. If google-cloud-translate is installed and
+GOOGLE_CLOUD_PROJECT is set, the official Cloud Translation API (v3) is used instead,
+through one persistent client that also accepts batches of texts per request.
 """
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List
 
 import os
 
@@ -21,17 +23,73 @@ except ImportError as e:  # package not installed in current env
 except Exception as e:  # installed but import failed (runtime compatibility)
     _IMPORT_ERR = e
 
+translate_v3 = None  # type: ignore
+try:
+    # Official client; only used when a Cloud project is configured
+    from google.cloud import translate_v3  # type: ignore
+except Exception:
+    pass
+
 LANG_CODE = {
     "English": "en",
     "Hindi": "hi",
     "Marathi": "mr",
 }
 
+_CLOUD_PROJECT = os.environ.get("GOOGLE_CLOUD_PROJECT")
+_USE_CLOUD = translate_v3 is not None and bool(_CLOUD_PROJECT)
+
+# Texts per request: the Cloud API takes a list of contents, googletrans translates one text per call
+GOOGLE_BATCH_SIZE = 128 if _USE_CLOUD else 1
+
+
+_TRANSLATOR = None
+_CLOUD_CLIENT = None
+
+
+def _get_translator():
+    """Return a shared Translator, created on first use (avoids per-call client/token setup)."""
+    global _TRANSLATOR
+    if not _HAS_GOOGLETRANS:
+        raise RuntimeError(f"googletrans unavailable: {_IMPORT_ERR}")
+    if _TRANSLATOR is None:
+        _TRANSLATOR = Translator()
+    return _TRANSLATOR
 
+
+def _get_cloud_client():
+    """Return a shared TranslationServiceClient; its gRPC channel keeps connections alive across calls."""
+    global _CLOUD_CLIENT
+    if _CLOUD_CLIENT is None:
+        _CLOUD_CLIENT = translate_v3.TranslationServiceClient()
+    return _CLOUD_CLIENT
+
+
+def _cloud_translate(texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+    response = _get_cloud_client().translate_text(request={
+        "parent": f"projects/{_CLOUD_PROJECT}/locations/global",
+        "contents": texts,
+        "mime_type": "text/plain",
+        "source_language_code": LANG_CODE[source_lang],
+        "target_language_code": LANG_CODE[target_lang],
+    })
+    return [t.translated_text for t in response.translations]
+
+
+@lru_cache(maxsize=1024)
 def translate_with_google(text: str, source_lang: str, target_lang: str) -> str:
-    # Placeholder translation logic: reverse the text
-    # Replace this with a real translation API as needed
-    return text[::-1]
+    """Translate via Google; results are memoized per (text, source_lang, target_lang), failures are not."""
+    if _USE_CLOUD:
+        return _cloud_translate([text], source_lang, target_lang)[0]
+    result = _get_translator().translate(text, src=LANG_CODE[source_lang], dest=LANG_CODE[target_lang])
+    return result.text
+
+
+def translate_batch_with_google(texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+    """Translate several texts of one language pair; a single request per call on the Cloud API."""
+    if _USE_CLOUD:
+        return _cloud_translate(list(texts), source_lang, target_lang)
+    return [translate_with_google(t, source_lang, target_lang) for t in texts]
 
 
 def compare_to_google(text: str, source_lang: str, target_lang: str, our_translation: str) -> Dict[str, str]:
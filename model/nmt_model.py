@@ -7,11 +7,16 @@ basic transliteration for Eng→Indic and optional evaluation metrics (BLEU, TER
 reference translations are provided.
 """
 
-from typing import Dict, Tuple, Optional, List
+from typing import Callable, Dict, Tuple, Optional, List
 
 import os
 import re
+import shutil
+import threading
+from collections import OrderedDict
 from pathlib import Path
+import numpy as np
+import torch
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
@@ -24,6 +29,16 @@ try:
 except Exception:
     _NLTK_OK = False
 
+# Inference-only module: keep torch's intra-op pool to about one thread per physical core (override with
+# NMT_NUM_THREADS) so it doesn't oversubscribe the CPU alongside Streamlit and the HF tokenizers' own pool
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+torch.set_num_threads(int(os.environ.get("NMT_NUM_THREADS", max(1, (os.cpu_count() or 2) // 2))))
+try:
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    # Already set, or inter-op work has started in this process
+    pass
+
 # Supported languages for the UI
 SUPPORTED_LANGUAGES = ["English", "Hindi", "Marathi"]
 
@@ -63,40 +78,210 @@ def _local_override_path(src: str, tgt: str) -> Optional[str]:
 
 
 _pipelines: Dict[Tuple[str, str], any] = {}
+# Guards _pipelines so concurrent Streamlit sessions don't load the same model twice
+_pipelines_lock = threading.Lock()
+
+# Number of sentences passed to a single model.generate call
+DEFAULT_BATCH_SIZE = 16
+
+
+def _device_and_dtype() -> Tuple[str, torch.dtype]:
+    """Pick the inference device and weight dtype.
+
+    Defaults to bf16 (fp16 on pre-Ampere GPUs) on CUDA and fp32 on CPU; set NMT_DTYPE to
+    float32, float16 or bfloat16 to override, e.g. NMT_DTYPE=float32 to fall back to full precision.
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    choice = os.environ.get("NMT_DTYPE", "auto").lower()
+    if choice == "auto":
+        if device == "cuda":
+            return device, torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        return device, torch.float32
+    if choice not in ("float32", "float16", "bfloat16"):
+        raise ValueError(f"Unsupported NMT_DTYPE: {choice}")
+    return device, getattr(torch, choice)
+
+
+def _disk_cache_path(model_name: str) -> Optional[Path]:
+    """Local safetensors copy of a hub model under NMT_CACHE_DIR (None for models already on disk)."""
+    if Path(model_name).is_dir():
+        return None
+    root = Path(os.environ.get("NMT_CACHE_DIR", "models/cache"))
+    return root / model_name.replace("/", "--")
+
+
+def _load_model(model_name: str, dtype: torch.dtype = torch.float32):
+    """Load tokenizer and model, preferring the disk cache and populating it on first load from the hub."""
+    cache = _disk_cache_path(model_name)
+    if cache is not None and (cache / "config.json").exists() and (cache / "model.safetensors").exists():
+        tok = AutoTokenizer.from_pretrained(cache)
+        mdl = AutoModelForSeq2SeqLM.from_pretrained(cache, torch_dtype=dtype, low_cpu_mem_usage=True)
+        return tok, mdl
+    tok = AutoTokenizer.from_pretrained(model_name)
+    if cache is None:
+        return tok, AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=dtype, low_cpu_mem_usage=True)
+    # Cache full-precision weights so a later run with a different NMT_DTYPE isn't stuck with rounded ones
+    mdl = AutoModelForSeq2SeqLM.from_pretrained(model_name, low_cpu_mem_usage=True)
+    # Save to a private temp dir and rename, so other processes never see a half-written cache
+    tmp = cache.with_name(f".{cache.name}.{os.getpid()}")
+    try:
+        mdl.save_pretrained(tmp, safe_serialization=True)
+        tok.save_pretrained(tmp)
+        os.replace(tmp, cache)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return tok, mdl.to(dtype)
+
+
+def _load_int8_model(model_name: str):
+    """Load a CPU model with Linear layers dynamically quantized to int8.
+
+    Weights come from the safetensors disk cache; quantize_dynamic runs on every load, since an eager
+    dynamic-quant state_dict still needs the same conversion pass to rebuild its modules.
+    """
+    tok, mdl = _load_model(model_name, torch.float32)
+    return tok, torch.ao.quantization.quantize_dynamic(mdl.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _compile_model(nlp) -> None:
+    """torch.compile the model's forward for generation and compile its graphs up front.
+
+    A static KV cache keeps cache shapes fixed across decode steps, and dynamic=True keeps batch size
+    and source length symbolic. Warming up with batch sizes and lengths of 1 and 2+ covers the shapes
+    dynamo specializes on, so later requests of any size reuse the compiled graphs instead of
+    recompiling. Falls back to eager mode if compilation fails (e.g. no C compiler for the inductor
+    CPU backend).
+    """
+    mdl = nlp.model
+    eager_forward = mdl.forward
+    eager_cache = mdl.generation_config.cache_implementation
+    mdl.generation_config.cache_implementation = "static"
+    mdl.forward = torch.compile(eager_forward, dynamic=True)
+    try:
+        for texts in (["Good morning, how are you?"], ["Hello there, how are you today?", "Good morning"]):
+            _generate(nlp, texts)
+    except Exception:
+        mdl.forward = eager_forward
+        mdl.generation_config.cache_implementation = eager_cache
 
 
 def _get_pipeline(src: str, tgt: str):
     key = (src, tgt)
-    if key in _pipelines:
-        return _pipelines[key], MODEL_MAP.get(key, "custom")
-    override = _override_from_env(src, tgt)
-    local_path = _local_override_path(src, tgt)
-    model_name = override or local_path or MODEL_MAP.get(key)
-    if model_name:
-        tok = AutoTokenizer.from_pretrained(model_name)
-        mdl = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        nlp = pipeline("translation", model=mdl, tokenizer=tok)
+    with _pipelines_lock:
+        if key in _pipelines:
+            return _pipelines[key], MODEL_MAP.get(key, "custom")
+        override = _override_from_env(src, tgt)
+        local_path = _local_override_path(src, tgt)
+        model_name = override or local_path or MODEL_MAP.get(key)
+        if model_name:
+            device, dtype = _device_and_dtype()
+            if device == "cpu" and os.environ.get("NMT_INT8"):
+                tok, mdl = _load_int8_model(model_name)
+            else:
+                tok, mdl = _load_model(model_name, dtype)
+            nlp = pipeline("translation", model=mdl, tokenizer=tok, device=0 if device == "cuda" else -1)
+            if os.environ.get("NMT_COMPILE"):
+                _compile_model(nlp)
+            _pipelines[key] = nlp
+            return nlp, model_name
+        # Fallback to generic pipeline task if nothing mapped (least preferred)
+        task = f"translation_{src}_to_{tgt}"
+        nlp = pipeline(task)
         _pipelines[key] = nlp
-        return nlp, model_name
-    # Fallback to generic pipeline task if nothing mapped (least preferred)
-    task = f"translation_{src}_to_{tgt}"
-    nlp = pipeline(task)
-    _pipelines[key] = nlp
-    return nlp, task
-
-
-def _pivot_translate(text: str, src: str, mid: str, tgt: str) -> Tuple[str, List[str]]:
-    """Translate via a pivot language (typically English). Returns translation and list of model names used."""
-    nlp1, name1 = _get_pipeline(src, mid)
-    out1 = nlp1(text)
-    tmp = out1[0].get("translation_text", "") if isinstance(out1, list) else out1.get("translation_text", "")
-
-    nlp2, name2 = _get_pipeline(mid, tgt)
-    out2 = nlp2(tmp)
-    final = out2[0].get("translation_text", "") if isinstance(out2, list) else out2.get("translation_text", "")
+        return nlp, task
+
+
+@torch.inference_mode()
+def _generate(nlp, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+              on_batch: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Translate texts with the pipeline's model, running one generate call per batch_size sentences.
+
+    Texts are sorted by tokenized length before slicing into batches so each batch pads to a similar
+    length; translations are returned in input order. on_batch(done, total) is called after each batch.
+    """
+    tok, mdl = nlp.tokenizer, nlp.model
+    lengths = [len(ids) for ids in tok(texts, truncation=True)["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+    outputs: List[str] = [""] * len(texts)
+    for start in range(0, len(texts), batch_size):
+        idxs = order[start:start + batch_size]
+        enc = tok([texts[i] for i in idxs], padding=True, truncation=True, return_tensors="pt").to(mdl.device)
+        generated = mdl.generate(**enc)
+        for i, out in zip(idxs, tok.batch_decode(generated, skip_special_tokens=True)):
+            outputs[i] = out
+        if on_batch is not None:
+            on_batch(start + len(idxs), len(texts))
+    return outputs
+
+
+# LRU memo of model outputs keyed on (src, tgt, text); generation is deterministic (greedy/fixed beams),
+# so repeated sentences and repeated pivot hops skip the model entirely. NMT_TRANSLATION_CACHE_SIZE=0 disables it.
+_TRANSLATION_CACHE_SIZE = int(os.environ.get("NMT_TRANSLATION_CACHE_SIZE", 4096))
+_translation_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_translation_cache_stats = {"hits": 0, "misses": 0}
+_translation_cache_lock = threading.Lock()
+
+
+def translation_cache_info() -> Dict[str, int]:
+    """Hit/miss counts and current size of the translation memo, for tuning NMT_TRANSLATION_CACHE_SIZE."""
+    with _translation_cache_lock:
+        return {**_translation_cache_stats, "size": len(_translation_cache), "maxsize": _TRANSLATION_CACHE_SIZE}
+
+
+def _translate_hop(texts: List[str], src: str, tgt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                   on_progress: Optional[Callable[[float], None]] = None) -> Tuple[List[str], str]:
+    """Translate texts with the src→tgt model, sending only memo misses to the model. Returns translations and model name.
+
+    on_progress(fraction), if given, is called after each generate batch.
+    """
+    nlp, model_name = _get_pipeline(src, tgt)
+    outputs: List[Optional[str]] = [None] * len(texts)
+    with _translation_cache_lock:
+        for i, text in enumerate(texts):
+            key = (src, tgt, text)
+            if key in _translation_cache:
+                _translation_cache.move_to_end(key)
+                outputs[i] = _translation_cache[key]
+        hits = sum(out is not None for out in outputs)
+        _translation_cache_stats["hits"] += hits
+        _translation_cache_stats["misses"] += len(texts) - hits
+    missing = list(dict.fromkeys(t for t, out in zip(texts, outputs) if out is None))
+    if missing:
+        on_batch = (lambda done, total: on_progress(done / total)) if on_progress is not None else None
+        translated = dict(zip(missing, _generate(nlp, missing, batch_size, on_batch)))
+        outputs = [translated[t] if out is None else out for t, out in zip(texts, outputs)]
+        if _TRANSLATION_CACHE_SIZE > 0:
+            with _translation_cache_lock:
+                for text, out in translated.items():
+                    _translation_cache[(src, tgt, text)] = out
+                while len(_translation_cache) > _TRANSLATION_CACHE_SIZE:
+                    _translation_cache.popitem(last=False)
+    return outputs, model_name
+
+
+def _pivot_translate(texts: List[str], src: str, mid: str, tgt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_progress: Optional[Callable[[float], None]] = None) -> Tuple[List[str], List[str]]:
+    """Translate via a pivot language (typically English). Returns translations and list of model names used."""
+    # Each hop is reported as half of the work
+    first = (lambda f: on_progress(f / 2)) if on_progress is not None else None
+    second = (lambda f: on_progress(0.5 + f / 2)) if on_progress is not None else None
+    tmp, name1 = _translate_hop(texts, src, mid, batch_size, first)
+    final, name2 = _translate_hop(tmp, mid, tgt, batch_size, second)
     return final, [name1, name2]
 
 
+def _model_translate(texts: List[str], src: str, tgt: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_progress: Optional[Callable[[float], None]] = None) -> Tuple[List[str], List[str]]:
+    """Direct model or pivot via English. Returns translations and list of model names used."""
+    if (src, tgt) in MODEL_MAP or _override_from_env(src, tgt) or _local_override_path(src, tgt):
+        translated, model_name = _translate_hop(texts, src, tgt, batch_size, on_progress)
+        return translated, [model_name]
+    return _pivot_translate(texts, src, "en", tgt, batch_size, on_progress)
+
+
+_NAMASTEY_RE = re.compile(r"\bnamastey\b")
+
+
 def _normalize_for_transliteration(text: str) -> str:
     """Normalize common romanized variants to improve ITRANS transliteration accuracy.
 
@@ -108,7 +293,7 @@ def _normalize_for_transliteration(text: str) -> str:
     t = t.lower()
     # Targeted fixes
     # Replace whole-word 'namastey' with 'namaste'
-    t = re.sub(r"\bnamastey\b", "namaste", t)
+    t = _NAMASTEY_RE.sub("namaste", t)
     return t
 
 
@@ -123,10 +308,12 @@ def transliterate_english_to_script(text: str, target_lang: str) -> str:
 
 
 # Simple romanized Hindi/Marathi hint tokens to trigger transliteration when appropriate
-_ROMANIZED_HINTS = {
+_ROMANIZED_HINTS = frozenset({
     "namaste", "namastey", "namaskar", "shukriya", "dhanyavad", "pranam", "kripya", "maaf", "sach", "dost",
     "pyaar", "pyar", "dil", "sab", "bhai", "behen", "pita", "maa", "matra", "aap", "hum",
-}
+})
+# Lowercase ASCII word tokens, used to match input against _ROMANIZED_HINTS
+_WORD_RE = re.compile(r"[a-z]+")
 
 
 # Map ASCII uppercase letters to common Hindi letter-name forms for acronyms (e.g., NLP -> एनएलपी)
@@ -138,14 +325,16 @@ _HI_ACRONYM_MAP = {
 }
 
 
+# Standalone all-caps tokens 2-6 letters (not embedded in larger words)
+_ACRONYM_RE = re.compile(r"(?<![A-Za-z])([A-Z]{2,6})(?![A-Za-z])")
+
+
 def _hindi_transliterate_acronyms(text: str) -> str:
     """Transliterate all-caps ASCII acronyms in a Hindi sentence into Devanagari letter-names.
 
     Example: "मैं NLP से प्यार करता हूँ" -> "मैं एनएलपी से प्यार करता हूँ"
     """
-    # Replace standalone all-caps tokens 2-6 letters (not embedded in larger words)
-    pattern = re.compile(r"(?<![A-Za-z])([A-Z]{2,6})(?![A-Za-z])")
-    return pattern.sub(lambda m: "".join(_HI_ACRONYM_MAP.get(ch, ch) for ch in m.group(1)), text)
+    return _ACRONYM_RE.sub(lambda m: "".join(_HI_ACRONYM_MAP.get(ch, ch) for ch in m.group(1)), text)
 
 
 def _adjust_progressive_loving(src_en: str, tgt_hi: str) -> str:
@@ -160,14 +349,19 @@ def _adjust_progressive_loving(src_en: str, tgt_hi: str) -> str:
     return tgt_hi
 
 
+# Shared metric instances, built once and reused here and by the evaluator/UI.
+# Effective order keeps sentence BLEU from collapsing to zero on short sentences without matching 4-grams.
+SENTENCE_BLEU_METRIC = sacrebleu.BLEU(effective_order=True)
+TER_METRIC = sacrebleu.metrics.TER()
+
+
 def evaluate_translation(hypothesis: str, reference: Optional[str]) -> Dict[str, Optional[float]]:
     """Compute BLEU, TER, METEOR given a reference string (if provided)."""
     if not reference or not reference.strip():
         return {"bleu": None, "ter": None, "meteor": None}
     refs = [reference]
-    bleu = float(sacrebleu.corpus_bleu([hypothesis], [refs]).score)
-    ter_metric = sacrebleu.metrics.TER()
-    ter = float(ter_metric.corpus_score([hypothesis], [refs]).score)
+    bleu = float(SENTENCE_BLEU_METRIC.sentence_score(hypothesis, refs).score)
+    ter = float(TER_METRIC.sentence_score(hypothesis, refs).score)
     meteor = None
     if _NLTK_OK:
         try:
@@ -178,48 +372,90 @@ def evaluate_translation(hypothesis: str, reference: Optional[str]) -> Dict[str,
     return {"bleu": bleu, "ter": ter, "meteor": meteor}
 
 
-def translate_text(text: str, source_lang: str, target_lang: str, use_transliteration: bool = False, reference: Optional[str] = None):
-    if not text.strip():
-        return {"translation": "", "model_name": None, "metrics": {"bleu": None, "ter": None, "meteor": None}}
-    if source_lang not in SUPPORTED_LANGUAGES or target_lang not in SUPPORTED_LANGUAGES:
-        raise ValueError("Unsupported language selected.")
-    if source_lang == target_lang:
-        return {"translation": text, "model_name": None, "metrics": {"bleu": None, "ter": None, "meteor": None}}
-
-    src = LANG_CODE[source_lang]
-    tgt = LANG_CODE[target_lang]
-
-    # Optional transliteration mode for Eng→Indic when input is romanized; also auto-trigger for common words
-    if source_lang == "English" and target_lang in ("Hindi", "Marathi") and text.isascii():
-        tokens = [t.strip(".,!?;:\"'()[]{}-").lower() for t in text.split()]
-        looks_romanized = any(t in _ROMANIZED_HINTS for t in tokens)
-        if use_transliteration or looks_romanized:
-            translated = transliterate_english_to_script(text, target_lang)
-            models_used: List[str] = ["transliteration(ITRANS)"]
-        else:
-            # fall through to model translation
-            translated = None  # type: ignore
-            models_used = []
-    else:
-        translated = None  # type: ignore
-        models_used = []
-
-    # Direct model or pivot via English (if not already handled by transliteration branch)
-    if translated is None:
-        if (src, tgt) in MODEL_MAP or _override_from_env(src, tgt) or _local_override_path(src, tgt):
-            nlp, model_name = _get_pipeline(src, tgt)
-            out = nlp(text)
-            translated = out[0].get("translation_text", "") if isinstance(out, list) else out.get("translation_text", "")
-            models_used = [model_name]
-        else:
-            translated, used = _pivot_translate(text, src, "en", tgt)
-            models_used = used
+def corpus_scores(systems: List[List[str]], references: List[str]) -> List[Dict[str, float]]:
+    """Corpus BLEU/TER for several systems' hypotheses against the same single reference stream.
+
+    References are tokenized and cached once by the metric objects, then reused for every system.
+    """
+    bleu_metric = sacrebleu.BLEU(references=[references])
+    ter_metric = sacrebleu.metrics.TER(references=[references])
+    return [{"bleu": float(bleu_metric.corpus_score(hyps, None).score),
+             "ter": float(ter_metric.corpus_score(hyps, None).score)} for hyps in systems]
+
+
+# No letters at all (digits, punctuation, symbols/emoji, whitespace): translation would be a no-op
+_NONTRANSLATABLE_RE = re.compile(r"[\W\d_]+")
+
+
+def _empty_metrics() -> Dict[str, Optional[float]]:
+    return {"bleu": None, "ter": None, "meteor": None}
+
 
+def _looks_romanized(text: str) -> bool:
+    return not _ROMANIZED_HINTS.isdisjoint(_WORD_RE.findall(text.lower()))
+
+
+def _postprocess(text: str, translated: str, source_lang: str, target_lang: str) -> str:
     # Post-processing for Hindi output: acronym transliteration and targeted aspect fix
     if target_lang == "Hindi":
         translated = _hindi_transliterate_acronyms(translated)
         if source_lang == "English":
             translated = _adjust_progressive_loving(text, translated)
+    return translated
+
+
+def translate_batch(texts: List[str], source_lang: str, target_lang: str, use_transliteration: bool = False,
+                    references: Optional[List[Optional[str]]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                    on_progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """Batched counterpart of translate_text for a single language pair.
+
+    Texts that need a model are translated together, batch_size sentences per generate call.
+    Texts made only of digits, punctuation, symbols/emoji and whitespace are returned unchanged
+    without running a model. Returns one result dict per input text, in input order, shaped like
+    translate_text's result. on_progress(done, total), if given, is called with the number of texts
+    finished so far after each generate batch.
+    """
+    if source_lang not in SUPPORTED_LANGUAGES or target_lang not in SUPPORTED_LANGUAGES:
+        raise ValueError("Unsupported language selected.")
+    if references is None:
+        references = [None] * len(texts)
+
+    results: List[Optional[Dict]] = [None] * len(texts)
+    pending: List[int] = []
+    for i, text in enumerate(texts):
+        if not text.strip():
+            results[i] = {"translation": "", "model_name": None, "metrics": _empty_metrics()}
+        elif source_lang == target_lang:
+            results[i] = {"translation": text, "model_name": None, "metrics": _empty_metrics()}
+        elif _NONTRANSLATABLE_RE.fullmatch(text):
+            results[i] = {"translation": text, "model_name": None, "metrics": evaluate_translation(text, references[i])}
+        # Optional transliteration mode for Eng→Indic when input is romanized; also auto-trigger for common words
+        elif (source_lang == "English" and target_lang in ("Hindi", "Marathi") and text.isascii()
+              and (use_transliteration or _looks_romanized(text))):
+            translated = _postprocess(text, transliterate_english_to_script(text, target_lang), source_lang, target_lang)
+            results[i] = {"translation": translated, "model_name": "transliteration(ITRANS)",
+                          "metrics": evaluate_translation(translated, references[i])}
+        else:
+            pending.append(i)
+
+    ready = len(texts) - len(pending)
+    if on_progress is not None:
+        on_progress(ready, len(texts))
+    if pending:
+        src = LANG_CODE[source_lang]
+        tgt = LANG_CODE[target_lang]
+        model_progress = None
+        if on_progress is not None:
+            model_progress = lambda f: on_progress(ready + int(f * len(pending)), len(texts))
+        translations, models_used = _model_translate([texts[i] for i in pending], src, tgt, batch_size, model_progress)
+        for i, translated in zip(pending, translations):
+            translated = _postprocess(texts[i], translated, source_lang, target_lang)
+            results[i] = {"translation": translated, "model_name": " + ".join(models_used),
+                          "metrics": evaluate_translation(translated, references[i])}
+    return results
 
-    metrics = evaluate_translation(translated, reference)
-    return {"translation": translated, "model_name": " + ".join(models_used), "metrics": metrics}
+
+def translate_text(text: str, source_lang: str, target_lang: str, use_transliteration: bool = False, reference: Optional[str] = None):
+    if not text.strip():
+        return {"translation": "", "model_name": None, "metrics": _empty_metrics()}
+    return translate_batch([text], source_lang, target_lang, use_transliteration=use_transliteration, references=[reference])[0]
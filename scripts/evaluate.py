@@ -14,121 +14,170 @@ Also prints corpus-level BLEU/TER and average METEOR for both Our system and Goo
 from __future__ import annotations
 import csv
 import sys
-from typing import List, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
 
-from model.nmt_model import translate_text
+import numpy as np
+import pandas as pd
+
+from model.nmt_model import DEFAULT_BATCH_SIZE, corpus_scores, evaluate_translation, translate_batch
 try:
-    from model.google_compare import translate_with_google  # optional
+    from model.google_compare import GOOGLE_BATCH_SIZE, translate_batch_with_google  # optional
     _HAS_GOOGLE = True
 except Exception:
     _HAS_GOOGLE = False
 
-import sacrebleu
 try:
-    from nltk.translate.meteor_score import meteor_score
+    from nltk.translate.meteor_score import meteor_score  # noqa: F401  (METEOR is scored in evaluate_translation)
     _HAS_NLTK = True
 except Exception:
     _HAS_NLTK = False
 
-
-def main(in_path: str, out_path: str) -> None:
+FIELDNAMES = ['source_lang', 'target_lang', 'src_text', 'ref_text', 'our_translation', 'google_translation',
+              'bleu', 'ter', 'meteor', 'google_bleu', 'google_ter', 'google_meteor']
+
+# Concurrent Google Translate requests during evaluation
+GOOGLE_MAX_WORKERS = 8
+
+
+def _nanmean(values: List[float]) -> float:
+    """Mean ignoring NaNs; NaN when there are no finite values."""
+    arr = np.asarray(values, dtype=np.float64)
+    return float(np.nanmean(arr)) if np.isfinite(arr).any() else float('nan')
+
+
+def _google_translations(rows: List[Tuple[str,str,str]], max_workers: int = GOOGLE_MAX_WORKERS,
+                         on_chunk: Optional[Callable[[int, int], None]] = None) -> List[str]:
+    """Fetch Google translations for (source_lang, target_lang, src_text) rows concurrently; each request is network-bound.
+
+    Rows are grouped per language pair into requests of GOOGLE_BATCH_SIZE texts (one text per
+    request with googletrans). Failed rows come back as "unavailable: <error>", in input order.
+    on_chunk(done, total), if given, is called as each request completes.
+    """
+    if not _HAS_GOOGLE:
+        if on_chunk is not None:
+            on_chunk(len(rows), len(rows))
+        return ["unavailable"] * len(rows)
+
+    groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for i, (src_lang, tgt_lang, _) in enumerate(rows):
+        groups[(src_lang, tgt_lang)].append(i)
+    chunks = [(pair, idxs[start:start + GOOGLE_BATCH_SIZE])
+              for pair, idxs in groups.items() for start in range(0, len(idxs), GOOGLE_BATCH_SIZE)]
+
+    def fetch(chunk: Tuple[Tuple[str, str], List[int]]) -> List[str]:
+        (src_lang, tgt_lang), idxs = chunk
+        try:
+            return translate_batch_with_google([rows[i][2] for i in idxs], src_lang, tgt_lang)
+        except Exception as e:
+            return [f"unavailable: {e}"] * len(idxs)
+
+    outputs: List[str] = [""] * len(rows)
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(fetch, chunk): chunk[1] for chunk in chunks}
+        for future in as_completed(futures):
+            idxs = futures[future]
+            for i, g in zip(idxs, future.result()):
+                outputs[i] = g
+            done += len(idxs)
+            if on_chunk is not None:
+                on_chunk(done, len(rows))
+    return outputs
+
+
+def main(in_path: str, out_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+         on_progress: Optional[Callable[[str, int, int], None]] = None) -> None:
+    """Evaluate in_path and write per-row results to out_path.
+
+    on_progress(stage, done, total), if given, reports distinct source rows finished so callers can show
+    progress: stage "translate" after each model batch, then "google" as each Google request completes.
+    """
     rows: List[Tuple[str,str,str,str]] = []
     with open(in_path, newline='', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for r in reader:
             rows.append((r['source_lang'], r['target_lang'], r['src_text'], r.get('ref_text','')))
 
-    outputs: List[dict] = []
-    hyps: List[str] = []
+    # Column-wise output: one list per CSV column, turned into a DataFrame only when writing
+    cols: Dict[str, list] = {k: [] for k in FIELDNAMES}
+    hyps: List[str] = cols['our_translation']
+    refs: List[str] = cols['ref_text']
     google_hyps: List[str] = []
-    refs: List[List[str]] = []
     meteors: List[float] = []
     google_meteors: List[float] = []
 
-    for src_lang, tgt_lang, src_text, ref_text in rows:
-        result = translate_text(src_text, src_lang, tgt_lang, use_transliteration=True, reference=ref_text)
+    # Translate (ours and Google) each distinct (source_lang, target_lang, src_text) once, then fan the
+    # results back out to every row that repeats it
+    unique_index: Dict[Tuple[str,str,str], int] = {}
+    row_to_unique = [unique_index.setdefault((s, t, x), len(unique_index)) for s, t, x, _ in rows]
+    unique_rows = list(unique_index)
+    if rows:
+        print(f"Unique sources: {len(unique_rows)}/{len(rows)} rows ({1 - len(unique_rows) / len(rows):.0%} deduplicated)")
+
+    # Translate each language pair in batches, then put results back at their original row index.
+    # Metrics are scored afterwards, once per row, with reused sacrebleu metric instances.
+    groups: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for i, (src_lang, tgt_lang, _) in enumerate(unique_rows):
+        groups[(src_lang, tgt_lang)].append(i)
+    unique_results: List[dict] = [{}] * len(unique_rows)
+    done = 0
+    for (src_lang, tgt_lang), idxs in groups.items():
+        group_progress = None
+        if on_progress is not None:
+            group_progress = lambda n, _, offset=done: on_progress("translate", offset + n, len(unique_rows))
+        batch = translate_batch([unique_rows[i][2] for i in idxs], src_lang, tgt_lang, use_transliteration=True,
+                                batch_size=batch_size, on_progress=group_progress)
+        for i, result in zip(idxs, batch):
+            unique_results[i] = result
+        done += len(idxs)
+        if on_progress is not None:
+            on_progress("translate", done, len(unique_rows))
+
+    google_progress = (lambda n, total: on_progress("google", n, total)) if on_progress is not None else None
+    unique_google = _google_translations(unique_rows, on_chunk=google_progress)
+    results = [unique_results[u] for u in row_to_unique]
+    google_outputs = [unique_google[u] for u in row_to_unique]
+
+    for (src_lang, tgt_lang, src_text, ref_text), result, g in zip(rows, results, google_outputs):
         hyp = result['translation']
-        hyps.append(hyp)
-        refs.append([ref_text])
-
-        if _HAS_NLTK and ref_text.strip():
-            try:
-                meteors.append(float(meteor_score([ref_text], hyp)))
-            except Exception:
-                meteors.append(float('nan'))
-        else:
-            meteors.append(float('nan'))
-
-        google_out = None
-        if _HAS_GOOGLE:
-            try:
-                g = translate_with_google(src_text, src_lang, tgt_lang)
-            except Exception as e:
-                g = f"unavailable: {e}"
-        else:
-            g = "unavailable"
-        google_out = g if not g.lower().startswith("unavailable") and not g.lower().startswith("google translate unavailable") else None
+        metrics = evaluate_translation(hyp, ref_text)
+        meteors.append(metrics['meteor'] if metrics['meteor'] is not None else float('nan'))
 
-        if google_out is not None:
-            google_hyps.append(google_out)
-            if _HAS_NLTK and ref_text.strip():
-                try:
-                    google_meteors.append(float(meteor_score([ref_text], google_out)))
-                except Exception:
-                    google_meteors.append(float('nan'))
-            else:
-                google_meteors.append(float('nan'))
+        google_out = g if not g.lower().startswith("unavailable") and not g.lower().startswith("google translate unavailable") else None
+        # keep alignment with refs for corpus scoring; use empty string placeholder
+        google_hyps.append(google_out or "")
+        # Google per-row metrics (when reference available and google_out exists)
+        if google_out is not None and google_out.strip():
+            google_metrics = evaluate_translation(google_out, ref_text)
         else:
-            # keep alignment with refs for corpus scoring; use empty string placeholder
-            google_hyps.append("")
-            google_meteors.append(float('nan'))
-
-        outputs.append({
-            'source_lang': src_lang,
-            'target_lang': tgt_lang,
-            'src_text': src_text,
-            'ref_text': ref_text,
-            'our_translation': hyp,
-            'google_translation': g,
-            'bleu': result['metrics'].get('bleu'),
-            'ter': result['metrics'].get('ter'),
-            'meteor': result['metrics'].get('meteor'),
-            # Google per-row metrics (when reference available and google_out exists)
-            'google_bleu': None,
-            'google_ter': None,
-            'google_meteor': None,
-        })
+            google_metrics = {"bleu": None, "ter": None, "meteor": None}
+        google_meteors.append(google_metrics['meteor'] if google_metrics['meteor'] is not None else float('nan'))
+
+        for key, value in zip(FIELDNAMES, (src_lang, tgt_lang, src_text, ref_text, hyp, g,
+                                           metrics['bleu'], metrics['ter'], metrics['meteor'],
+                                           google_metrics['bleu'], google_metrics['ter'], google_metrics['meteor'])):
+            cols[key].append(value)
 
     # Corpus-level metrics
     # sacrebleu expects detok strings; we pass as-is
-    has_any_ref = any(r[0].strip() for r in refs)
-    corpus_bleu = sacrebleu.corpus_bleu(hyps, refs).score if has_any_ref else None
-    ter_metric = sacrebleu.metrics.TER()
-    corpus_ter = ter_metric.corpus_score(hyps, refs).score if has_any_ref else None
-    avg_meteor = sum(x for x in meteors if x==x) / max(1, sum(1 for x in meteors if x==x))  # ignore NaNs
+    # Only rows with a reference count; both systems are scored on the same rows
+    ref_rows = [i for i, r in enumerate(refs) if r.strip()]
+    has_any_ref = bool(ref_rows)
+    # References are tokenized once and shared by our and Google's corpus scores
+    ours, google = corpus_scores([[hyps[i] for i in ref_rows], [google_hyps[i] for i in ref_rows]],
+                                 [refs[i] for i in ref_rows]) if has_any_ref else ({}, {})
+    corpus_bleu = ours.get('bleu')
+    corpus_ter = ours.get('ter')
+    avg_meteor = _nanmean(meteors)
 
     # Google corpus metrics (only if we have google outputs and references)
-    google_corpus_bleu = sacrebleu.corpus_bleu(google_hyps, refs).score if has_any_ref else None
-    google_corpus_ter = ter_metric.corpus_score(google_hyps, refs).score if has_any_ref else None
-    google_avg_meteor = sum(x for x in google_meteors if x==x) / max(1, sum(1 for x in google_meteors if x==x)) if _HAS_NLTK else None
-
-    with open(out_path, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = list(outputs[0].keys()) if outputs else ['source_lang','target_lang','src_text','ref_text','our_translation','google_translation','bleu','ter','meteor','google_bleu','google_ter','google_meteor']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        # Compute per-row Google metrics when possible (needs reference and non-empty google hypothesis)
-        for i, o in enumerate(outputs):
-            ref = refs[i][0]
-            g_hyp = google_hyps[i]
-            if has_any_ref and ref.strip() and g_hyp.strip():
-                try:
-                    o['google_bleu'] = float(sacrebleu.corpus_bleu([g_hyp], [[ref]]).score)
-                    o['google_ter'] = float(ter_metric.corpus_score([g_hyp], [[ref]]).score)
-                    if _HAS_NLTK:
-                        o['google_meteor'] = float(meteor_score([ref], g_hyp))
-                except Exception:
-                    pass
-            writer.writerow(o)
+    google_corpus_bleu = google.get('bleu')
+    google_corpus_ter = google.get('ter')
+    google_avg_meteor = _nanmean(google_meteors) if _HAS_NLTK else None
+
+    pd.DataFrame(cols, columns=FIELDNAMES).to_csv(out_path, index=False)
 
     print("Our Corpus BLEU:", f"{corpus_bleu:.2f}" if corpus_bleu is not None else '-')
     print("Our Corpus TER:", f"{corpus_ter:.2f}" if corpus_ter is not None else '-')
@@ -148,6 +197,6 @@ def main(in_path: str, out_path: str) -> None:
 
 if __name__ == '__main__':
     if len(sys.argv) < 3:
-        print("Usage: python scripts/evaluate.py <input.csv> <output.csv>")
+        print("Usage: python scripts/evaluate.py <input.csv> <output.csv> [batch_size]")
         sys.exit(1)
-    main(sys.argv[1], sys.argv[2])
+    main(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_BATCH_SIZE)
@@ -0,0 +1,19 @@
+import os
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.nmt_model import translate_text
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_translator():
+    # Load the en->hi pipeline once per session (once per worker under pytest -n auto)
+    # so the first test doesn't pay for it; tests that need it still fail on their own if it can't load
+    try:
+        translate_text("Hello", "English", "Hindi")
+    except Exception:
+        pass
@@ -1,12 +1,50 @@
+import csv
 import os
 import sys
+from collections import OrderedDict
+from types import SimpleNamespace
+
 import pytest
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from model.nmt_model import translate_text, SUPPORTED_LANGUAGES
+import model.nmt_model as nmt
+from model.nmt_model import translate_text, translate_batch, SUPPORTED_LANGUAGES
+import scripts.evaluate as evaluate
+
+
+class _StubEncoding(dict):
+    def to(self, device):
+        return self
+
+
+class _StubTokenizer:
+    """One token per word; "translation" upper-cases the text."""
+
+    def __call__(self, texts, return_tensors=None, **kwargs):
+        if return_tensors:
+            return _StubEncoding(texts=list(texts))
+        return {"input_ids": [t.split() for t in texts]}
+
+    def batch_decode(self, generated, skip_special_tokens=True):
+        return [t.upper() for t in generated]
+
+
+class _StubModel:
+    device = "cpu"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, texts):
+        self.calls.append(texts)
+        return texts
+
+
+def _stub_pipeline():
+    return SimpleNamespace(tokenizer=_StubTokenizer(), model=_StubModel())
 
 
 def test_empty_input():
@@ -41,3 +79,122 @@ def test_metrics_keys_when_reference_provided():
     res = translate_text("Hello", "English", "Hindi", reference="नमस्ते")
     m = res.get("metrics") or {}
     assert set(["bleu", "ter", "meteor"]).issubset(set(m.keys()))
+
+
+def test_translate_batch_preserves_input_order():
+    res = translate_batch(["Namaste", "   ", "Namastey"], "English", "Hindi")
+    assert [r["translation"].strip() for r in res] == ["नमस्ते", "", "नमस्ते"]
+
+
+def test_romanized_hint_detected_inside_punctuation():
+    res = translate_text("Namaste-ji, kaise ho?", "English", "Hindi")
+    assert "transliteration" in (res.get("model_name") or "")
+
+
+def test_non_translatable_input_returned_unchanged():
+    res = translate_text("2024 - 10:30 !!", "English", "Hindi")
+    assert res["translation"] == "2024 - 10:30 !!"
+    assert res["model_name"] is None
+
+
+def test_generate_batches_by_length_and_restores_order():
+    nlp = _stub_pipeline()
+    texts = ["a b c d", "a", "a b c", "a b", "a b c d e", "a"]
+    out = nmt._generate(nlp, texts, batch_size=4)
+    assert out == [t.upper() for t in texts]
+    assert [len(c) for c in nlp.model.calls] == [4, 2]
+    lengths = [len(t.split()) for call in nlp.model.calls for t in call]
+    assert lengths == sorted(lengths)
+
+
+@pytest.fixture
+def stub_nlp(monkeypatch):
+    nlp = _stub_pipeline()
+    monkeypatch.setattr(nmt, "_get_pipeline", lambda src, tgt: (nlp, f"stub-{src}-{tgt}"))
+    monkeypatch.setattr(nmt, "_translation_cache", OrderedDict())
+    monkeypatch.setattr(nmt, "_translation_cache_stats", {"hits": 0, "misses": 0})
+    return nlp
+
+
+def test_translation_cache_dedupes_and_counts_hits(stub_nlp):
+    out, _ = nmt._translate_hop(["a", "b", "a"], "hi", "en")
+    assert out == ["A", "B", "A"]
+    assert stub_nlp.model.calls == [["a", "b"]]
+    nmt._translate_hop(["b", "c"], "hi", "en")
+    assert stub_nlp.model.calls[1:] == [["c"]]
+    info = nmt.translation_cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 4, 3)
+
+
+def test_translation_cache_skips_cached_pivot_hops(stub_nlp):
+    res = translate_batch(["x y"], "Hindi", "Marathi")
+    assert res[0]["translation"] == "X Y"
+    assert stub_nlp.model.calls == [["x y"], ["X Y"]]
+    translate_batch(["x y"], "Hindi", "Marathi")
+    assert len(stub_nlp.model.calls) == 2
+    assert nmt.translation_cache_info()["hits"] == 2
+
+
+def test_translation_cache_evicts_least_recently_used(stub_nlp, monkeypatch):
+    monkeypatch.setattr(nmt, "_TRANSLATION_CACHE_SIZE", 2)
+    for text in ["a", "b", "a", "c"]:
+        nmt._translate_hop([text], "hi", "en")
+    assert list(nmt._translation_cache) == [("hi", "en", "a"), ("hi", "en", "c")]
+
+
+def test_translation_cache_disabled_with_size_zero(stub_nlp, monkeypatch):
+    monkeypatch.setattr(nmt, "_TRANSLATION_CACHE_SIZE", 0)
+    nmt._translate_hop(["a"], "hi", "en")
+    nmt._translate_hop(["a"], "hi", "en")
+    assert stub_nlp.model.calls == [["a"], ["a"]]
+    assert nmt.translation_cache_info()["size"] == 0
+
+
+def test_evaluate_scores_repeated_sources_against_each_reference(tmp_path, monkeypatch):
+    # Transliteration and punctuation-only rows need no model; Google is disabled
+    monkeypatch.setattr(evaluate, "_HAS_GOOGLE", False)
+    calls = []
+
+    def recording_translate_batch(texts, *args, **kwargs):
+        calls.append(list(texts))
+        return translate_batch(texts, *args, **kwargs)
+
+    monkeypatch.setattr(evaluate, "translate_batch", recording_translate_batch)
+    in_path, out_path = tmp_path / "history.csv", tmp_path / "eval.csv"
+    with open(in_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source_lang", "target_lang", "src_text", "ref_text"])
+        writer.writerows([
+            ["English", "Hindi", "namaste", "नमस्ते"],
+            ["English", "Hindi", "2024 !!", ""],
+            ["English", "Hindi", "namaste", "नमस्ते दोस्त"],
+            ["English", "Hindi", "namaste", ""],
+        ])
+    evaluate.main(str(in_path), str(out_path))
+
+    assert calls == [["namaste", "2024 !!"]]
+    with open(out_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["src_text"] for r in rows] == ["namaste", "2024 !!", "namaste", "namaste"]
+    assert [r["our_translation"] for r in rows] == ["नमस्ते", "2024 !!", "नमस्ते", "नमस्ते"]
+    assert [r["ref_text"] for r in rows] == ["नमस्ते", "", "नमस्ते दोस्त", ""]
+    assert float(rows[0]["bleu"]) == pytest.approx(100.0)
+    assert float(rows[2]["bleu"]) < 100.0
+    assert rows[1]["bleu"] == rows[3]["bleu"] == ""
+
+
+def test_evaluate_corpus_scores_skip_rows_without_reference(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(evaluate, "_HAS_GOOGLE", False)
+    in_path = tmp_path / "history.csv"
+    with open(in_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source_lang", "target_lang", "src_text", "ref_text"])
+        writer.writerows([
+            ["English", "Hindi", "namaste", "नमस्ते"],
+            ["English", "Hindi", "dost", ""],
+            ["English", "Hindi", "2024 !!", ""],
+        ])
+    evaluate.main(str(in_path), str(tmp_path / "eval.csv"))
+
+    # The one referenced row is an exact match; unreferenced rows would otherwise add edits against ""
+    assert "Our Corpus TER: 0.00" in capsys.readouterr().out
@@ -16,15 +16,25 @@ CSV format:
 Notes:
 - Tokenizer: Helsinki Marian tokenizer inferred from model name.
 - Model name default is based on src/tgt pair; override via --model_name if needed.
-- Evaluation prints BLEU using sacrebleu (detokenized strings) on the fly.
+- Tokenized train/eval sets are cached as Arrow files in output_dir and reused while the CSVs are unchanged.
+- Evaluation prints BLEU on the fly (detokenized strings), using bleuscore when installed and sacrebleu otherwise.
+- Mixed precision is picked automatically (bf16 on Ampere+ GPUs, fp16 on older GPUs, fp32 on CPU);
+  override with --bf16/--no-bf16 and --fp16/--no-fp16.
+- Multi-GPU: launch with torchrun and pass --deepspeed ds_zero2.json or --fsdp "full_shard auto_wrap"
+  to shard optimizer state, gradients and (FSDP) parameters across GPUs.
 """
 from __future__ import annotations
 import argparse
+import hashlib
+import importlib.util
 import os
 from pathlib import Path
 from typing import List
 
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+import torch
 from datasets import Dataset
 from transformers import (AutoTokenizer, AutoModelForSeq2SeqLM, DataCollatorForSeq2Seq,
                           Seq2SeqTrainingArguments, Seq2SeqTrainer)
@@ -39,30 +49,58 @@ PAIR_TO_MODEL = {
 
 
 def load_csv(path: str) -> Dataset:
-    df = pd.read_csv(path)
-    if not {"src","tgt"}.issubset(df.columns):
+    # Parse straight into an Arrow table; keep text columns as strings even if they look numeric
+    table = pv.read_csv(path,
+                        parse_options=pv.ParseOptions(newlines_in_values=True),
+                        convert_options=pv.ConvertOptions(column_types={"src": pa.string(), "tgt": pa.string()}))
+    if not {"src","tgt"}.issubset(table.column_names):
         raise ValueError("CSV must contain columns: src,tgt")
-    return Dataset.from_pandas(df[["src","tgt"]])
+    return Dataset(table.select(["src","tgt"]))
+
+
+def tokenized_cache_file(output_dir: Path, split: str, path: str, model_name: str, max_len: int) -> str:
+    # Key the Arrow cache on the CSV's identity and the tokenization settings so edits invalidate it
+    st = os.stat(path)
+    key = f"{Path(path).resolve()}|{st.st_mtime_ns}|{st.st_size}|{model_name}|{max_len}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return str(output_dir / f"tok_{split}_{digest}.arrow")
+
+
+def _load(cls, name: str, **kwargs):
+    # Use files already on disk without contacting the hub; download only when they are missing
+    try:
+        return cls.from_pretrained(name, local_files_only=True, **kwargs)
+    except OSError:
+        return cls.from_pretrained(name, **kwargs)
+
+
+def within_char_limit(examples, limit: int) -> List[bool]:
+    return [src is not None and tgt is not None and len(src) <= limit and len(tgt) <= limit
+            for src, tgt in zip(examples["src"], examples["tgt"])]
 
 
 def preprocess(examples, tokenizer, src_lang: str, tgt_lang: str, max_len: int = 128):
-    inputs = examples["src"]
-    targets = examples["tgt"]
-    model_inputs = tokenizer(inputs, max_length=max_len, truncation=True)
-    with tokenizer.as_target_tokenizer():
-        labels = tokenizer(targets, max_length=max_len, truncation=True)
-    model_inputs["labels"] = labels["input_ids"]
-    return model_inputs
+    # One tokenizer call encodes sources and targets (targets become "labels")
+    return tokenizer(examples["src"], text_target=examples["tgt"], max_length=max_len, truncation=True)
 
 
 def compute_bleu(eval_preds, tokenizer):
     preds, labels = eval_preds
     if isinstance(preds, tuple):
         preds = preds[0]
-    decoded_preds = tokenizer.batch_decode(preds, skip_special_tokens=True)
-    labels = [[l for l in label if l != -100] for label in labels]
-    decoded_labels = tokenizer.batch_decode(labels, skip_special_tokens=True)
-    bleu = sacrebleu.corpus_bleu(decoded_preds, [decoded_labels]).score
+    # -100 marks ignored label positions, and the Trainer also uses it to pad generated ids across
+    # eval batches; map both to pad so they decode to nothing
+    preds = np.where(np.asarray(preds) == -100, tokenizer.pad_token_id, preds)
+    labels = np.where(np.asarray(labels) == -100, tokenizer.pad_token_id, labels)
+    decoded_preds = tokenizer.batch_decode(preds.tolist(), skip_special_tokens=True)
+    decoded_labels = tokenizer.batch_decode(labels.tolist(), skip_special_tokens=True)
+    try:
+        # Rust n-gram counting; much faster than sacrebleu on large eval sets
+        import bleuscore
+        bleu = bleuscore.compute(predictions=decoded_preds, references=[[l] for l in decoded_labels],
+                                 max_order=4)["bleu"] * 100
+    except ImportError:
+        bleu = sacrebleu.corpus_bleu(decoded_preds, [decoded_labels]).score
     return {"bleu": bleu}
 
 
@@ -77,46 +115,119 @@ def main():
     ap.add_argument("--num_train_epochs", type=int, default=1)
     ap.add_argument("--per_device_train_batch_size", type=int, default=8)
     ap.add_argument("--per_device_eval_batch_size", type=int, default=8)
+    ap.add_argument("--gradient_accumulation_steps", type=int, default=1)
     ap.add_argument("--lr", type=float, default=5e-5)
     ap.add_argument("--max_len", type=int, default=128)
     ap.add_argument("--weight_decay", type=float, default=0.01)
+    # Decoding for eval during training; greedy and capped at --max_len by default to keep evals cheap
+    ap.add_argument("--generation_max_length", type=int, required=False)
+    ap.add_argument("--generation_num_beams", type=int, default=1)
+    # Move accumulated eval predictions off the GPU every N eval steps
+    ap.add_argument("--eval_accumulation_steps", type=int, default=16)
+    # Worker processes for dataset tokenization
+    ap.add_argument("--num_proc", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    # DataLoader worker processes for collation (0 collates in the training process)
+    ap.add_argument("--num_workers", type=int, default=4)
+    # Trainer optimizer name; defaults to fused AdamW on CUDA (8-bit variants such as adamw_bnb_8bit need bitsandbytes)
+    ap.add_argument("--optim", required=False)
+    # Recompute activations in the backward pass to fit larger batches in GPU memory
+    ap.add_argument("--gradient_checkpointing", action="store_true")
+    # Sharded multi-GPU training: a DeepSpeed config JSON (e.g. ZeRO-2) or FSDP options such as "full_shard auto_wrap"
+    ap.add_argument("--deepspeed", required=False)
+    ap.add_argument("--fsdp", required=False)
+    # Compile the model with TorchInductor (PyTorch 2+); the first steps are slower while it compiles
+    ap.add_argument("--torch_compile", action="store_true")
+    # Mixed precision; by default bf16 on GPUs that support it, fp16 on older CUDA GPUs, off on CPU
+    ap.add_argument("--bf16", action=argparse.BooleanOptionalAction, default=None)
+    ap.add_argument("--fp16", action=argparse.BooleanOptionalAction, default=None)
     args = ap.parse_args()
 
+    cuda = torch.cuda.is_available()
+    bf16 = args.bf16 if args.bf16 is not None else (cuda and torch.cuda.is_bf16_supported())
+    fp16 = args.fp16 if args.fp16 is not None else (cuda and not bf16)
+    # TF32 matmuls for the remaining fp32 ops need Ampere or newer
+    tf32 = True if cuda and torch.cuda.get_device_capability()[0] >= 8 else None
+    optim = args.optim or ("adamw_torch_fused" if cuda else "adamw_torch")
+    if any(tag in optim for tag in ("bnb", "8bit", "paged")) and importlib.util.find_spec("bitsandbytes") is None:
+        optim = "adamw_torch_fused" if cuda else "adamw_torch"
+        print(f"{args.optim} needs bitsandbytes (pip install bitsandbytes); using {optim}")
+    torch_compile = args.torch_compile and hasattr(torch, "compile")
+    if args.torch_compile and not torch_compile:
+        print("torch.compile needs PyTorch 2.0+; training the eager model")
+
     pair = (args.src_lang, args.tgt_lang)
     model_name = args.model_name or PAIR_TO_MODEL.get(pair)
     if not model_name:
         raise ValueError(f"No base model for pair {pair}")
 
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    tokenizer = _load(AutoTokenizer, model_name, use_fast=True)
+    model = _load(AutoModelForSeq2SeqLM, model_name)
+    if args.gradient_checkpointing:
+        # The decoder KV cache is incompatible with recomputing activations
+        model.config.use_cache = False
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     train_ds = load_csv(args.train_file)
     eval_ds = load_csv(args.eval_file) if args.eval_file else None
+    # Drop pathologically long training pairs (~8 chars per token) rather than tokenizing and truncating them
+    train_ds = train_ds.filter(within_char_limit, fn_kwargs={"limit": args.max_len * 8},
+                               batched=True, batch_size=1000, num_proc=args.num_proc)
 
+    # Reruns with unchanged data memory-map the cached Arrow files instead of re-tokenizing
     tokenized_train = train_ds.map(lambda x: preprocess(x, tokenizer, args.src_lang, args.tgt_lang, args.max_len),
-                                   batched=True, remove_columns=train_ds.column_names)
+                                   batched=True, batch_size=1000, num_proc=args.num_proc,
+                                   remove_columns=train_ds.column_names,
+                                   cache_file_name=tokenized_cache_file(output_dir, "train", args.train_file,
+                                                                        model_name, args.max_len),
+                                   load_from_cache_file=True)
     tokenized_eval = None
     if eval_ds is not None:
         tokenized_eval = eval_ds.map(lambda x: preprocess(x, tokenizer, args.src_lang, args.tgt_lang, args.max_len),
-                                     batched=True, remove_columns=eval_ds.column_names)
+                                     batched=True, batch_size=1000, num_proc=args.num_proc,
+                                     remove_columns=eval_ds.column_names,
+                                     cache_file_name=tokenized_cache_file(output_dir, "eval", args.eval_file,
+                                                                          model_name, args.max_len),
+                                     load_from_cache_file=True)
 
-    data_collator = DataCollatorForSeq2Seq(tokenizer=tokenizer, model=model)
-
-    output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # Pad to multiples of 8 under mixed precision so GEMM shapes stay tensor-core aligned
+    data_collator = DataCollatorForSeq2Seq(tokenizer=tokenizer, model=model,
+                                           pad_to_multiple_of=8 if bf16 or fp16 else None)
 
     training_args = Seq2SeqTrainingArguments(
         output_dir=str(output_dir),
-        evaluation_strategy="steps" if tokenized_eval is not None else "no",
+        eval_strategy="steps" if tokenized_eval is not None else "no",
         logging_strategy="steps",
         save_strategy="epoch",
         learning_rate=args.lr,
         per_device_train_batch_size=args.per_device_train_batch_size,
         per_device_eval_batch_size=args.per_device_eval_batch_size,
+        eval_accumulation_steps=args.eval_accumulation_steps,
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+        gradient_checkpointing=args.gradient_checkpointing,
+        gradient_checkpointing_kwargs={"use_reentrant": False} if args.gradient_checkpointing else None,
+        # Bucket similar-length examples so batches carry fewer pad tokens
+        group_by_length=True,
         num_train_epochs=args.num_train_epochs,
         weight_decay=args.weight_decay,
+        optim=optim,
+        deepspeed=args.deepspeed,
+        fsdp=args.fsdp or "",
+        fsdp_config={"transformer_layer_cls_to_wrap": ["MarianEncoderLayer", "MarianDecoderLayer"]} if args.fsdp else None,
         predict_with_generate=True,
-        fp16=False,
+        generation_max_length=args.generation_max_length or args.max_len,
+        generation_num_beams=args.generation_num_beams,
+        bf16=bf16,
+        fp16=fp16,
+        bf16_full_eval=bf16,
+        tf32=tf32,
+        torch_compile=torch_compile,
+        torch_compile_backend="inductor" if torch_compile else None,
+        dataloader_num_workers=args.num_workers,
+        dataloader_pin_memory=True,
+        dataloader_persistent_workers=args.num_workers > 0,
+        dataloader_prefetch_factor=2 if args.num_workers > 0 else None,
         report_to=[],
     )
 
@@ -131,6 +242,8 @@ def main():
     )
 
     trainer.train()
+    # Save with the KV cache enabled so generation in the app stays fast
+    model.config.use_cache = True
     trainer.save_model(output_dir)
     tokenizer.save_pretrained(output_dir)
 